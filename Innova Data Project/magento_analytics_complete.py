@@ -2,8 +2,8 @@
 #  MAGENTO DATA ANALYTICS — COMPLETE PYTHON REFERENCE
 #  Resource Innovations | Data Analytics Coordinator Portfolio
 # ============================================================
-#  REQUIREMENTS: pip install pandas openpyxl
-#  PYTHON:       3.8+
+#  REQUIREMENTS: pip install "pandas>=2.1" pyarrow openpyxl
+#  PYTHON:       3.9+
 #
 #  PURPOSE: Full pipeline from synthetic data generation →
 #           database creation → validation → transformation →
@@ -33,17 +33,38 @@
 # ============================================================
 
 import sqlite3          # built-in SQL database — no install needed
-import pandas as pd     # data manipulation: pip install pandas
+import pandas as pd     # data manipulation: pip install pandas pyarrow
+import numpy as np      # vectorized math: installed with pandas
+import pyarrow as pa    # Arrow tables: pip install pyarrow
+import pyarrow.csv as pacsv   # fast multithreaded CSV writer
 import json             # built-in: convert data to JSON format
-import random           # built-in: generate random test data
 import datetime         # built-in: work with dates and times
 import os               # built-in: file paths and directories
-from openpyxl import Workbook                         # Excel file creation
 from openpyxl.styles import Font, PatternFill, Alignment   # Excel formatting
 from openpyxl.utils import get_column_letter          # column letter helper
 
-# Set a random seed so results are the same every run
-random.seed(42)
+# Arrow-backed string dtype for the raw text columns (IDs, SKUs,
+# statuses, emails): contiguous Arrow buffers instead of one Python
+# object per cell. Missing values stay NaN, as with plain strings.
+# pandas 2.3+ spells this StringDtype("pyarrow", na_value=np.nan)
+# (the "str" default from 3.0); 2.1/2.2 call it "pyarrow_numpy".
+try:
+    ARROW_STR = pd.StringDtype("pyarrow", na_value=np.nan)
+except TypeError:
+    ARROW_STR = pd.StringDtype("pyarrow_numpy")
+
+def arrow_strings(df):
+    """
+    Helper: return df with its text columns stored as ARROW_STR.
+    Numeric, bool and category columns are left as they are, so the
+    float64 NumPy math on the money columns is unchanged.
+    """
+    text_cols = df.select_dtypes(include=["object", "string"]).columns
+    return df.astype(dict.fromkeys(text_cols, ARROW_STR))
+
+# Seeded NumPy random generator so results are the same every run.
+# It draws whole columns of test data in one call.
+rng = np.random.default_rng(42)
 
 # Create folder structure for outputs
 for folder in ["data/raw", "data/processed", "data/output"]:
@@ -89,21 +110,26 @@ last_names  = ["Smith","Johnson","Williams","Brown","Jones","Garcia","Miller",
                "Harris","Martin","Thompson","Moore","Young","Allen"]
 states      = ["CA","TX","NY","FL","WA","OR","CO","IL","GA","AZ"]
 
-customers = []
-for i in range(1, 51):
-    customers.append({
-        "customer_id":  f"CUST-{i:04d}",
-        "first_name":   random.choice(first_names),
-        "last_name":    random.choice(last_names),
-        "email":        f"user{i}@example.com",
-        "state":        random.choice(states),
-        # Date stored as ISO 8601 from the start — customers table is clean
-        "created_at":   (datetime.date(2024, 1, 1) +
-                         datetime.timedelta(days=random.randint(0, 180))).isoformat(),
-        "loyalty_tier": random.choice(["bronze", "silver", "gold", "None"])
-    })
-
-df_customers = pd.DataFrame(customers)
+n_customers = 50
+
+# IDs and emails are built with NumPy's vectorized string functions
+# (np.char) over the whole array of numbers: 1 → '0001' → 'CUST-0001'
+customer_nums = np.arange(1, n_customers + 1).astype(str)
+
+# Build each column as a whole array and hand pandas a dict of
+# columns — no list of per-row dicts to grow and then transpose.
+df_customers = pd.DataFrame({
+    "customer_id":  np.char.add("CUST-", np.char.zfill(customer_nums, 4)),
+    "first_name":   rng.choice(first_names, n_customers),
+    "last_name":    rng.choice(last_names, n_customers),
+    "email":        np.char.add(np.char.add("user", customer_nums), "@example.com"),
+    "state":        rng.choice(states, n_customers),
+    # Date stored as ISO 8601 from the start — customers table is clean
+    "created_at":   (pd.Timestamp(2024, 1, 1)
+                     + pd.to_timedelta(rng.integers(0, 181, n_customers), unit="D")
+                    ).strftime("%Y-%m-%d"),
+    "loyalty_tier": rng.choice(["bronze", "silver", "gold", "None"], n_customers),
+})
 
 # ── Orders data (intentionally messy) ───────────────────────
 # SKU pool: same product appears under different formats.
@@ -118,125 +144,147 @@ sku_pool = [
     "SKU-REBATE-006",                   # clean
 ]
 statuses = ["complete", "processing", "pending", "closed", "canceled"]
+payment_methods = ["authorizenet", "paypal", "free"]
 
-orders = []
+# Lookup arrays for the sampled columns. Each column is filled by
+# drawing a batch of random positions and indexing the array with
+# them, so each pool is converted to an array only once.
+customer_id_arr    = df_customers["customer_id"].to_numpy()
+sku_arr            = np.array(sku_pool)
+status_arr         = np.array(statuses)
+payment_method_arr = np.array(payment_methods)
+
+n_orders  = 100
 base_date = datetime.datetime(2024, 6, 1)
 
-for i in range(1, 101):
-    cust       = random.choice(customers)
-    subtotal   = round(random.uniform(20, 500), 2)
-
-    # ISSUE: Two different tax recording approaches in same export.
-    # About half the orders were created when Magento used combined tax.
-    # The other half were created after a config change to itemized tax.
-    use_combined = random.random() < 0.5
-    state_tax    = round(subtotal * 0.06, 2)    # 6% state tax
-    county_tax   = round(subtotal * 0.015, 2)   # 1.5% county tax
-    combined     = round(state_tax + county_tax, 2) if use_combined else None
-
-    shipping     = round(random.uniform(0, 25), 2)
-    discount     = round(random.uniform(0, subtotal * 0.1), 2)
-    grand_total  = round(
-        subtotal + (combined if combined else state_tax + county_tax)
-        + shipping - discount, 2
-    )
+# Zero-padded order numbers shared by order_id and invoice_number
+order_nums = np.char.zfill(np.arange(1, n_orders + 1).astype(str), 5)
+
+# Every column is drawn for all 100 orders in one NumPy call instead
+# of looping over orders one at a time.
+subtotals = rng.uniform(20, 500, n_orders).round(2)
+
+# ISSUE: Two different tax recording approaches in same export.
+# About half the orders were created when Magento used combined tax.
+# The other half were created after a config change to itemized tax.
+use_combined = rng.random(n_orders) < 0.5
+state_tax    = (subtotals * 0.06).round(2)     # 6% state tax
+county_tax   = (subtotals * 0.015).round(2)    # 1.5% county tax
+combined     = np.where(use_combined, (state_tax + county_tax).round(2), np.nan)
+
+shipping     = rng.uniform(0, 25, n_orders).round(2)
+discount     = rng.uniform(0, subtotals * 0.1).round(2)
+grand_total  = (
+    subtotals + np.where(use_combined, combined, state_tax + county_tax)
+    + shipping - discount
+).round(2)
 
-    orders.append({
-        "order_id":       f"ORD-{i:05d}",
-        "customer_id":    cust["customer_id"],
-        # ISSUE: Date stored in US format, not ISO 8601
-        # Magento defaults to MM/DD/YYYY — needs conversion
-        "order_date":     (base_date + datetime.timedelta(
-                              days=random.randint(0, 90),
-                              hours=random.randint(0, 23),
-                              minutes=random.randint(0, 59)
-                          )).strftime("%m/%d/%Y %H:%M"),
-        "sku":            random.choice(sku_pool),
-        "qty":            random.randint(1, 5),
-        # ISSUE: Subtotal exported as a formatted currency string
-        # e.g. "$215.08" instead of the number 215.08
-        "subtotal":       f"${subtotal:,.2f}",
-        # Tax fields: one format or the other, never both
-        "state_tax":      state_tax if not use_combined else None,
-        "county_tax":     county_tax if not use_combined else None,
-        "combined_tax":   combined,
-        "shipping":       shipping,
-        "discount":       discount,
-        "grand_total":    grand_total,
-        "status":         random.choice(statuses),
-        "payment_method": random.choice(["authorizenet", "paypal", "free"]),
-        # ISSUE: ~10% of orders have no invoice_number
-        # This happens when the billing step didn't complete
-        "invoice_number": f"INV-{i:05d}" if random.random() > 0.1 else None,
-    })
+# Random offset of up to 90 days, 23 hours and 59 minutes from base_date.
+# Kept as a datetime Series (same row index as df_orders) so later
+# steps can reuse it instead of parsing the date strings again.
+order_dt = pd.Series(base_date + (
+    pd.to_timedelta(rng.integers(0, 91, n_orders), unit="D")
+    + pd.to_timedelta(rng.integers(0, 24, n_orders), unit="h")
+    + pd.to_timedelta(rng.integers(0, 60, n_orders), unit="m")
+))
+
+df_orders = pd.DataFrame({
+    "order_id":       np.char.add("ORD-", order_nums),
+    "customer_id":    customer_id_arr[rng.integers(0, len(customer_id_arr), n_orders)],
+    # ISSUE: Date stored in US format, not ISO 8601
+    # Magento defaults to MM/DD/YYYY — needs conversion
+    "order_date":     order_dt.dt.strftime("%m/%d/%Y %H:%M"),
+    "sku":            sku_arr[rng.integers(0, len(sku_arr), n_orders)],
+    "qty":            rng.integers(1, 6, n_orders),
+    # ISSUE: Subtotal exported as a formatted currency string
+    # e.g. "$215.08" instead of the number 215.08
+    "subtotal":       "$" + pd.Series(subtotals).map("{:,.2f}".format),
+    # Tax fields: one format or the other, never both
+    "state_tax":      np.where(use_combined, np.nan, state_tax),
+    "county_tax":     np.where(use_combined, np.nan, county_tax),
+    "combined_tax":   combined,
+    "shipping":       shipping,
+    "discount":       discount,
+    "grand_total":    grand_total,
+    "status":         status_arr[rng.integers(0, len(status_arr), n_orders)],
+    "payment_method": payment_method_arr[rng.integers(0, len(payment_method_arr), n_orders)],
+    # ISSUE: ~10% of orders have no invoice_number
+    # This happens when the billing step didn't complete
+    "invoice_number": np.where(
+        rng.random(n_orders) > 0.1,
+        np.char.add("INV-", order_nums),
+        None
+    ),
+})
 
 # ISSUE: Inject 5 duplicate rows (simulates a re-export overlap)
 # In practice: someone exported June 1-30, then exported June 15 - July 15,
 # causing orders from June 15-30 to appear in both exports.
-dup_indices = random.sample(range(100), 5)
-for idx in dup_indices:
-    orders.append(orders[idx].copy())
-
-df_orders = pd.DataFrame(orders)
+# A single iloc slice + concat copies all 5 rows at once.
+dup_indices = rng.choice(n_orders, 5, replace=False)
+df_orders = pd.concat([df_orders, df_orders.iloc[dup_indices]], ignore_index=True)
 
 # ── Payment transaction data (Authorize.net style) ───────────
 # Only complete/processing orders would have a payment transaction.
 # We generate transactions only for those, then add orphans.
-transactions = []
 settled_orders = (
     df_orders[df_orders["status"].isin(["complete", "processing"])]
     .drop_duplicates("order_id")
 )
-
-for _, row in settled_orders.iterrows():
-    # Authorize.net charges 2.9% of the transaction + $0.30 flat fee
-    fee = round(row["grand_total"] * 0.029 + 0.30, 2)
-    net = round(row["grand_total"] - fee, 2)
-
-    transactions.append({
-        "transaction_id":  f"TXN-{random.randint(100000, 999999)}",
-        "order_id":        row["order_id"],
-        # Settlements typically arrive 2 business days after the order
-        "settle_date":     (
-            datetime.datetime.strptime(row["order_date"], "%m/%d/%Y %H:%M")
-            + datetime.timedelta(days=2)
-        ).strftime("%Y-%m-%d"),
-        "gross_amount":    row["grand_total"],
-        "processor_fee":   fee,
-        "net_amount":      net,
-        # Not every transaction settles: some get voided or refunded
-        "status":          random.choice(["settled", "settled", "settled",
-                                          "voided", "refunded"]),
-        "auth_code":       f"AUTH{random.randint(10000, 99999)}",
-    })
+n_txn = len(settled_orders)
+
+# Build every column for all settled orders at once instead of
+# looping over rows and appending one dict per transaction.
+txn = pd.DataFrame({
+    "transaction_id": np.char.add("TXN-", rng.integers(100000, 1000000, n_txn).astype(str)),
+    "order_id":       settled_orders["order_id"].values,
+    # Settlements typically arrive 2 business days after the order
+    "settle_date":    (
+        order_dt.loc[settled_orders.index] + pd.Timedelta(days=2)
+    ).dt.strftime("%Y-%m-%d").values,
+    "gross_amount":   settled_orders["grand_total"].values,
+})
+# Authorize.net charges 2.9% of the transaction + $0.30 flat fee
+txn["processor_fee"] = (txn["gross_amount"] * 0.029 + 0.30).round(2)
+txn["net_amount"]    = (txn["gross_amount"] - txn["processor_fee"]).round(2)
+# Not every transaction settles: some get voided or refunded
+txn["status"]        = rng.choice(["settled", "settled", "settled",
+                                   "voided", "refunded"], n_txn)
+txn["auth_code"]     = np.char.add("AUTH", rng.integers(10000, 100000, n_txn).astype(str))
 
 # ISSUE: Inject 3 orphan transactions — money the processor has
 # on record but no matching Magento order exists.
 # This could mean: deleted orders, orders from another system,
 # or (worst case) fraudulent charges.
-for i in range(3):
-    transactions.append({
-        "transaction_id": f"TXN-ORPHAN-{i}",
-        "order_id":       f"ORD-GHOST-{i}",   # these IDs don't exist in Magento
-        "settle_date":    "2024-09-01",
-        "gross_amount":   round(random.uniform(50, 200), 2),
-        "processor_fee":  5.00,
-        "net_amount":     round(random.uniform(45, 195), 2),
-        "status":         "settled",
-        "auth_code":      f"AUTH99{i}",
-    })
-
-df_transactions = pd.DataFrame(transactions)
+orphan_txn = pd.DataFrame({
+    "transaction_id": [f"TXN-ORPHAN-{i}" for i in range(3)],
+    "order_id":       [f"ORD-GHOST-{i}" for i in range(3)],   # these IDs don't exist in Magento
+    "settle_date":    "2024-09-01",
+    "gross_amount":   rng.uniform(50, 200, 3).round(2),
+    "processor_fee":  5.00,
+    "net_amount":     rng.uniform(45, 195, 3).round(2),
+    "status":         "settled",
+    "auth_code":      [f"AUTH99{i}" for i in range(3)],
+})
+
+df_transactions = pd.concat([txn, orphan_txn], ignore_index=True)
+
+# Store the raw exports' text columns as Arrow-backed strings
+df_customers    = arrow_strings(df_customers)
+df_orders       = arrow_strings(df_orders)
+df_transactions = arrow_strings(df_transactions)
 
 # ── Save raw CSVs ────────────────────────────────────────────
 # These files represent the raw exports before ANY cleaning.
 # Always save the originals — never overwrite them.
+# Later sections work from the in-memory frames and the SQLite
+# tables, so these files are only written, never read back.
 df_customers.to_csv("data/raw/magento_customers.csv", index=False)
 df_orders.to_csv("data/raw/magento_orders.csv", index=False)
 df_transactions.to_csv("data/raw/payment_transactions.csv", index=False)
 
 print(f"  ✅ {len(df_customers)} customers saved to data/raw/magento_customers.csv")
-print(f"  ✅ {len(df_orders)} orders saved  (includes {len(df_orders)-100} duplicate rows)")
+print(f"  ✅ {len(df_orders)} orders saved  (includes {len(df_orders)-n_orders} duplicate rows)")
 print(f"  ✅ {len(df_transactions)} transactions saved (includes 3 orphan records)")
 
 
@@ -258,13 +306,92 @@ print("\n[SECTION 3] Loading raw data into SQLite...")
 # Create an in-memory SQLite database
 # ":memory:" means the database lives only in RAM — no file created
 conn = sqlite3.connect(":memory:")
-conn.execute("PRAGMA journal_mode=WAL")  # improves write performance
+# Keep temp tables (sorts, index builds) in RAM and give SQLite a
+# ~64 MB page cache (negative value = size in KB)
+conn.execute("PRAGMA temp_store=MEMORY")
+conn.execute("PRAGMA cache_size=-64000")
 
-# Load each dataframe as a SQL table
-# if_exists="replace" drops and recreates the table each run
-df_orders.to_sql("magento_orders",       conn, index=False, if_exists="replace")
-df_customers.to_sql("magento_customers", conn, index=False, if_exists="replace")
-df_transactions.to_sql("payment_transactions", conn, index=False, if_exists="replace")
+def sql_type(dtype):
+    """
+    Helper: the SQLite column type for a pandas dtype — the same
+    INTEGER / REAL / TEXT choices to_sql() makes. Bool is stored as
+    0/1; strings and categories (whatever their labels) are TEXT.
+    """
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def load_table(df, table_name):
+    """
+    Helper: write a DataFrame to SQLite as a table.
+    The table is dropped and recreated each run, with column types
+    from sql_type(). Rows go in through executemany(), which reuses
+    one prepared INSERT for every row.
+    Values are first converted to plain Python objects, and every
+    missing value (NaN, None, pd.NA) to None, which SQLite stores as
+    NULL. That covers int/float/bool (NumPy or nullable), string and
+    category columns. Not supported: datetime columns (format them
+    as text first) and object columns holding NumPy scalars such as
+    np.int64 (convert them with .astype() first).
+    Unlike to_sql(), this never commits — call it inside a transaction
+    (see below) so several loads succeed or fail together.
+    """
+    columns = ", ".join(f'"{col}" {sql_type(dtype)}' for col, dtype in df.dtypes.items())
+    conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    conn.execute(f'CREATE TABLE "{table_name}" ({columns})')
+    placeholders = ", ".join(["?"] * len(df.columns))
+    rows = df.astype(object).where(df.notna(), None)
+    conn.executemany(
+        f'INSERT INTO "{table_name}" VALUES ({placeholders})',
+        rows.itertuples(index=False, name=None),
+    )
+
+# Find duplicate order IDs once in pandas, BEFORE loading, so SQLite
+# never has to scan for them and the cleaning step doesn't have to
+# re-read the raw CSV. keep=False marks every copy of a repeated ID.
+dup_mask = df_orders.duplicated(subset="order_id", keep=False)
+df_dupes_audit = (
+    df_orders.loc[dup_mask, ["order_id"]]
+    .groupby("order_id")
+    .size()
+    .reset_index(name="occurrences")
+)
+# keep="first" retains the first occurrence of each order_id
+# and drops the later copies.
+df_orders_unique = df_orders.drop_duplicates(subset="order_id", keep="first")
+
+# Load each dataframe as a SQL table inside one transaction.
+# The explicit BEGIN makes the CREATE TABLE statements part of it too;
+# "with conn" then commits once at the end, or rolls back everything
+# if any load fails.
+with conn:
+    conn.execute("BEGIN")
+    load_table(df_orders_unique, "magento_orders")
+    load_table(df_dupes_audit,   "duplicate_audit")
+    load_table(df_customers,     "magento_customers")
+    load_table(df_transactions,  "payment_transactions")
+
+    # The tables are created without indexes, so every join on order_id would scan
+    # the whole table. Index the join keys once, then ANALYZE so the
+    # query planner knows the table sizes. magento_orders is already
+    # deduplicated, so its order_id index can be UNIQUE.
+    conn.execute("CREATE UNIQUE INDEX ix_orders_id ON magento_orders(order_id)")
+    conn.execute("CREATE INDEX ix_txn_order_id ON payment_transactions(order_id)")
+    conn.execute("ANALYZE")
+
+def show_df(df, label):
+    """
+    Helper: print a label and a DataFrame to the console for review.
+    """
+    print(f"\n  ── {label}")
+    if df.empty:
+        print("     ✅ No issues found.")
+    else:
+        # Indent the output for readability
+        for line in df.to_string(index=False).split("\n"):
+            print(f"     {line}")
 
 def run_sql(sql, label=""):
     """
@@ -273,18 +400,29 @@ def run_sql(sql, label=""):
     """
     df = pd.read_sql(sql, conn)
     if label:
-        print(f"\n  ── {label}")
-        if df.empty:
-            print("     ✅ No issues found.")
-        else:
-            # Indent the output for readability
-            for line in df.to_string(index=False).split("\n"):
-                print(f"     {line}")
+        show_df(df, label)
     return df
 
+def run_sql_row(sql, label=""):
+    """
+    Helper: execute an aggregate query that returns ONE row of numbers
+    and print each column as "name  value".
+    Reads straight from the SQLite cursor — no DataFrame is built just
+    to display a handful of counts. Returns the row as a dict.
+    """
+    cur = conn.execute(sql)
+    row = dict(zip([d[0] for d in cur.description], cur.fetchone()))
+    if label:
+        print(f"\n  ── {label}")
+        width = max(len(col) for col in row)
+        for col, value in row.items():
+            print(f"     {col:<{width}}  {value}")
+    return row
+
 print("  ✅ Tables loaded:")
 counts = run_sql("""
     SELECT 'magento_orders' AS tbl, COUNT(*) AS rows FROM magento_orders
+    UNION ALL SELECT 'duplicate_audit', COUNT(*) FROM duplicate_audit
     UNION ALL SELECT 'magento_customers', COUNT(*) FROM magento_customers
     UNION ALL SELECT 'payment_transactions', COUNT(*) FROM payment_transactions
 """)
@@ -293,7 +431,10 @@ counts = run_sql("""
 # ============================================================
 # SECTION 4: VALIDATION — FIND ALL DATA QUALITY PROBLEMS
 # ============================================================
-# These queries run BEFORE any cleaning.
+# These queries run BEFORE any cleaning of values. The only change
+# so far is in magento_orders: duplicate rows were set aside in
+# Section 3 (and recorded in duplicate_audit), so it holds one row
+# per order_id. The raw export still has every row.
 # Document every issue found so there is an audit trail.
 # In the real role, you'd share these findings with the
 # finance team before proceeding to transformation.
@@ -307,28 +448,27 @@ issues_log = []  # We'll collect all issues here for the output files
 
 
 # ── 4A. Duplicate detection ──────────────────────────────────
-# GROUP BY order_id, count how many times each appears.
-# HAVING COUNT(*) > 1 filters to only the duplicates.
+# The duplicates were counted in Section 3 before loading, and
+# magento_orders only holds the first copy of each order_id.
+# The duplicate_audit table lists each repeated ID and how many
+# times it appeared in the raw export.
 print("\n[4A] Checking for duplicate order IDs...")
 dupes = run_sql("""
-    SELECT
-        order_id,
-        COUNT(*) AS occurrences
-    FROM magento_orders
-    GROUP BY order_id
-    HAVING COUNT(*) > 1
+    SELECT order_id, occurrences
+    FROM duplicate_audit
     ORDER BY occurrences DESC
 """, "Duplicate order IDs found:")
 
 # Log each duplicate to the issues list
-for _, row in dupes.iterrows():
-    issues_log.append({
-        "issue_type":     "DUPLICATE_ORDER",
-        "order_id":       row["order_id"],
-        "transaction_id": None,
-        "detail":         f"order_id appears {row['occurrences']}x in export",
-        "action_required": "Keep first occurrence — delete remaining rows"
-    })
+# to_dict("records") pulls all rows out in one call — much cheaper
+# than iterrows(), which builds a full Series object for every row.
+issues_log.extend({
+    "issue_type":     "DUPLICATE_ORDER",
+    "order_id":       row["order_id"],
+    "transaction_id": None,
+    "detail":         f"order_id appears {row['occurrences']}x in export",
+    "action_required": "Keep first occurrence — delete remaining rows"
+} for row in dupes.to_dict("records"))
 print(f"  → {len(dupes)} order IDs have duplicates")
 
 
@@ -336,7 +476,7 @@ print(f"  → {len(dupes)} order IDs have duplicates")
 # CASE WHEN ... IS NULL THEN 1 ELSE 0 END counts NULLs per column.
 # SUM() across all rows gives the total null count per column.
 print("\n[4B] Auditing for missing (NULL) fields...")
-run_sql("""
+run_sql_row("""
     SELECT
         SUM(CASE WHEN order_id       IS NULL THEN 1 ELSE 0 END) AS null_order_id,
         SUM(CASE WHEN customer_id    IS NULL THEN 1 ELSE 0 END) AS null_customer_id,
@@ -344,9 +484,11 @@ run_sql("""
         SUM(CASE WHEN grand_total     IS NULL THEN 1 ELSE 0 END) AS null_grand_total,
         SUM(CASE WHEN invoice_number  IS NULL THEN 1 ELSE 0 END) AS null_invoice_number,
         SUM(CASE WHEN payment_method  IS NULL THEN 1 ELSE 0 END) AS null_payment_method,
-        COUNT(*) AS total_rows
+        COUNT(*) AS unique_orders
     FROM magento_orders
 """, "NULL count per column:")
+print(f"  → {len(df_orders)} rows in the raw export "
+      f"({len(df_orders) - len(df_orders_unique)} duplicate rows set aside in Section 3)")
 
 missing_inv = run_sql("""
     SELECT order_id, customer_id, status, grand_total, invoice_number
@@ -355,14 +497,13 @@ missing_inv = run_sql("""
     ORDER BY order_id
 """, "Orders missing invoice_number:")
 
-for _, row in missing_inv.iterrows():
-    issues_log.append({
-        "issue_type":     "MISSING_INVOICE",
-        "order_id":       row["order_id"],
-        "transaction_id": None,
-        "detail":         "invoice_number is NULL — cannot submit for payment",
-        "action_required": "Request invoice number from finance/billing team"
-    })
+issues_log.extend({
+    "issue_type":     "MISSING_INVOICE",
+    "order_id":       row["order_id"],
+    "transaction_id": None,
+    "detail":         "invoice_number is NULL — cannot submit for payment",
+    "action_required": "Request invoice number from finance/billing team"
+} for row in missing_inv.to_dict("records"))
 print(f"  → {len(missing_inv)} orders are missing an invoice number")
 
 
@@ -370,7 +511,7 @@ print(f"  → {len(missing_inv)} orders are missing an invoice number")
 # Count how many orders use each tax format.
 # We'll need to unify these in Section 5.
 print("\n[4C] Checking tax field format consistency...")
-run_sql("""
+run_sql_row("""
     SELECT
         SUM(CASE WHEN combined_tax IS NOT NULL                         THEN 1 ELSE 0 END) AS combined_format,
         SUM(CASE WHEN state_tax IS NOT NULL AND county_tax IS NOT NULL THEN 1 ELSE 0 END) AS itemized_format,
@@ -398,16 +539,34 @@ run_sql("""
 # Find SKU values that map to the same normalized code.
 # These are the same product but entered differently.
 print("\n[4D] Checking for inconsistent SKU formats...")
-run_sql("""
-    SELECT
-        UPPER(REPLACE(REPLACE(sku, '_', '-'), ' ', '-'))       AS normalized_sku,
-        COUNT(DISTINCT sku)                                     AS raw_variant_count,
-        GROUP_CONCAT(DISTINCT sku)                              AS raw_variants,
-        COUNT(*)                                                AS total_orders
-    FROM magento_orders
-    GROUP BY UPPER(REPLACE(REPLACE(sku, '_', '-'), ' ', '-'))
-    HAVING COUNT(DISTINCT sku) > 1
-""", "SKU variants that should be the same product:")
+
+# Normalization rule (reused as-is by Transform 2 in Section 5):
+# uppercase all characters, replace underscores/spaces with hyphens.
+# Computed once here in pandas rather than with nested
+# UPPER(REPLACE(REPLACE(...))) calls on every row inside SQLite.
+normalized_sku = (
+    df_orders_unique["sku"]
+    .str.strip()           # remove leading/trailing spaces
+    .str.upper()           # 'sku_led_001' → 'SKU_LED_001'
+    # One regex pass replaces both underscores and spaces with hyphens:
+    # 'SKU_LED_001' → 'SKU-LED-001'
+    .str.replace(r"[_ ]", "-", regex=True)
+)
+
+sku_variants = (
+    df_orders_unique.assign(normalized_sku=normalized_sku)
+    .groupby("normalized_sku")["sku"]
+    .agg(
+        raw_variant_count="nunique",
+        raw_variants=lambda s: ",".join(s.unique()),
+        total_orders="count"
+    )
+    .reset_index()
+)
+show_df(
+    sku_variants[sku_variants["raw_variant_count"] > 1],
+    "SKU variants that should be the same product:"
+)
 
 
 # ── 4E. Currency format check ────────────────────────────────
@@ -427,19 +586,15 @@ sample = run_sql("""
 # ── 4F. Date format check ────────────────────────────────────
 # Dates in 'MM/DD/YYYY HH:MM' format need to become ISO 8601
 print("\n[4F] Checking date format...")
-run_sql("""
-    SELECT
-        order_id,
-        order_date AS raw_date,
-        -- Reconstruct to ISO format using SUBSTR:
-        -- Original: '06/22/2024 12:00'
-        -- SUBSTR(order_date,7,4) → '2024'   (year, starting at char 7, 4 chars long)
-        -- SUBSTR(order_date,1,2) → '06'     (month)
-        -- SUBSTR(order_date,4,2) → '22'     (day)
-        SUBSTR(order_date,7,4)||'-'||SUBSTR(order_date,1,2)||'-'||SUBSTR(order_date,4,2) AS iso_date
-    FROM magento_orders
-    LIMIT 5
-""", "Sample: raw date vs ISO 8601 conversion:")
+# The timestamps were already parsed once (order_dt), so the ISO
+# version comes straight from pandas' vectorized strftime instead of
+# rebuilding every date from SUBSTR() pieces inside SQLite.
+show_df(
+    df_orders[["order_id", "order_date"]].head(5)
+    .rename(columns={"order_date": "raw_date"})
+    .assign(iso_date=order_dt.head(5).dt.strftime("%Y-%m-%dT%H:%M:%SZ")),
+    "Sample: raw date vs ISO 8601 conversion:"
+)
 
 
 # ── 4G. Orphan transaction check ────────────────────────────
@@ -459,14 +614,13 @@ orphans = run_sql("""
       AND t.status = 'settled'
 """, "Orphan transactions (settled but no Magento order):")
 
-for _, row in orphans.iterrows():
-    issues_log.append({
-        "issue_type":     "ORPHAN_TRANSACTION",
-        "order_id":       row["order_id"],
-        "transaction_id": row["transaction_id"],
-        "detail":         f"${row['gross_amount']} settled — no matching Magento order",
-        "action_required": "Escalate to finance team for investigation"
-    })
+issues_log.extend({
+    "issue_type":     "ORPHAN_TRANSACTION",
+    "order_id":       row["order_id"],
+    "transaction_id": row["transaction_id"],
+    "detail":         f"${row['gross_amount']} settled — no matching Magento order",
+    "action_required": "Escalate to finance team for investigation"
+} for row in orphans.to_dict("records"))
 print(f"  → {len(orphans)} orphan transactions found")
 
 # Save the issues log for later
@@ -487,39 +641,32 @@ print("\n" + "=" * 65)
 print("  SECTION 5: DATA CLEANING & TRANSFORMATION")
 print("=" * 65)
 
-# Reload the raw CSV to work from a fresh copy
-orders = pd.read_csv("data/raw/magento_orders.csv")
-print(f"\n  Starting with {len(orders)} raw order rows")
+print(f"\n  Starting with {len(df_orders)} raw order rows")
 
 
 # ── Transform 1: Remove duplicates ──────────────────────────
-# keep="first" retains the first occurrence of each order_id
-# and marks later occurrences as duplicates to drop.
+# Already done in Section 3 (drop_duplicates, keep="first") before
+# loading into SQLite — work from a fresh copy of that frame
+# instead of re-reading and re-deduplicating the raw CSV.
 print("\n[T1] Deduplication...")
-before = len(orders)
-orders = orders.drop_duplicates(subset="order_id", keep="first")
-after  = len(orders)
-print(f"  Removed {before - after} duplicate rows → {after} unique orders remain")
+orders = df_orders_unique.copy()
+print(f"  Removed {len(df_orders) - len(orders)} duplicate rows → {len(orders)} unique orders remain")
 
 
 # ── Transform 2: SKU normalization ──────────────────────────
 # Rule: uppercase all characters, replace underscores with hyphens.
 # This makes 'sku_led_001', 'SKU-LED-001', 'SKU_LED_001' all
 # become the same canonical 'SKU-LED-001'.
+# The normalized values were already computed for check 4D, and
+# both frames share the same row index, so we just attach them.
 print("\n[T2] SKU normalization...")
 
-sku_before = orders["sku"].value_counts().to_dict()
+orders["normalized_sku"] = normalized_sku
 
-orders["normalized_sku"] = (
-    orders["sku"]
-    .str.upper()           # 'sku_led_001' → 'SKU_LED_001'
-    .str.strip()           # remove leading/trailing spaces
-    .str.replace("_", "-", regex=False)  # 'SKU_LED_001' → 'SKU-LED-001'
-    .str.replace(" ", "-", regex=False)  # handle any spaces in SKU codes
-)
-
-# Report: show all cases where normalization changed the value
-changed = orders[orders["sku"] != orders["normalized_sku"]][["order_id", "sku", "normalized_sku"]]
+# Report: show all cases where normalization changed the value.
+# .loc[mask, columns] filters and picks columns in one step, instead
+# of first copying every column of the matching rows.
+changed = orders.loc[orders["sku"] != orders["normalized_sku"], ["order_id", "sku", "normalized_sku"]]
 print(f"  {len(changed)} orders had their SKU normalized:")
 print(changed.to_string(index=False))
 
@@ -535,9 +682,8 @@ sample_before = orders["subtotal"].head(3).tolist()
 
 orders["subtotal_clean"] = (
     orders["subtotal"]
-    .str.replace("$", "", regex=False)    # remove dollar sign
-    .str.replace(",", "", regex=False)    # remove thousands comma
-    .astype(float)                         # convert string to number
+    .str.replace(r"[$,]", "", regex=True)  # remove dollar sign and thousands comma in one pass
+    .astype("float64")                     # convert string to number
     .round(2)                              # enforce 2 decimal places
 )
 
@@ -556,26 +702,27 @@ for col in ["shipping", "discount", "grand_total"]:
 #   - Track which method was used in a 'tax_source' column
 print("\n[T4] Tax field unification...")
 
-def resolve_tax(row):
-    """
-    Resolve the tax amount from whichever format is present.
-    Returns (total_tax, source_format).
-    """
-    if pd.notna(row["combined_tax"]):
-        # Order was created when Magento used combined tax
-        return round(row["combined_tax"], 2), "combined"
-    elif pd.notna(row["state_tax"]) and pd.notna(row["county_tax"]):
-        # Order was created when Magento used itemized tax
-        return round(row["state_tax"] + row["county_tax"], 2), "itemized"
-    else:
-        # Neither field is populated — flag for review
-        return None, "missing"
-
-# apply() runs the function on every row, result_type="expand"
-# splits the tuple return into two columns
-tax_result = orders.apply(resolve_tax, axis=1, result_type="expand")
-orders["total_tax"]  = tax_result[0]   # the unified tax amount
-orders["tax_source"] = tax_result[1]   # 'combined', 'itemized', or 'missing'
+# Build boolean masks for each format once, then resolve every row
+# at the same time with np.where / np.select instead of calling a
+# Python function per row with apply().
+has_combined = orders["combined_tax"].notna().values
+has_itemized = orders["state_tax"].notna().values & orders["county_tax"].notna().values
+
+orders["total_tax"] = np.where(
+    has_combined,
+    orders["combined_tax"].fillna(0),           # combined tax format
+    np.where(
+        has_itemized,
+        orders["state_tax"].fillna(0) + orders["county_tax"].fillna(0),  # itemized format
+        np.nan                                  # neither populated → flag for review
+    )
+).round(2)
+# Only three possible values, so store as a Categorical: one small
+# integer code per row plus a 3-entry lookup table of labels.
+orders["tax_source"] = pd.Categorical(
+    np.select([has_combined, has_itemized], ["combined", "itemized"], default="missing"),
+    categories=["combined", "itemized", "missing"]
+)
 
 tax_dist = orders["tax_source"].value_counts()
 print(f"  combined: {tax_dist.get('combined',0)} orders")
@@ -585,13 +732,14 @@ print(f"  missing:  {tax_dist.get('missing',0)} orders")
 
 # ── Transform 5: Date normalization ─────────────────────────
 # Convert 'MM/DD/YYYY HH:MM' to ISO 8601: 'YYYY-MM-DDTHH:MM:SSZ'
-# pd.to_datetime() is smart enough to parse most date formats.
+# Passing the exact format lets pandas use its fast fixed-format
+# parser instead of guessing the format element by element.
 # errors="coerce" turns any unparseable dates into NaT (null) instead of crashing.
 print("\n[T5] Date normalization...")
 sample_before = orders["order_date"].head(3).tolist()
 
 orders["order_date_iso"] = (
-    pd.to_datetime(orders["order_date"], errors="coerce")
+    pd.to_datetime(orders["order_date"], format="%m/%d/%Y %H:%M", errors="coerce")
     .dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 )
 
@@ -616,9 +764,24 @@ STATUS_MAP = {
     "canceled":   ("999", "VOID",        False),
 }
 
-orders["dynamics_code"]      = orders["status"].map(lambda s: STATUS_MAP.get(s, ("000","UNKNOWN",False))[0])
-orders["status_label"]        = orders["status"].map(lambda s: STATUS_MAP.get(s, ("000","UNKNOWN",False))[1])
-orders["payment_eligible"]    = orders["status"].map(lambda s: STATUS_MAP.get(s, ("000","UNKNOWN",False))[2])
+# Turn the lookup dict into a small table and LEFT JOIN it once —
+# one join adds all three columns instead of three per-row lookups.
+status_df = (
+    pd.DataFrame.from_dict(
+        STATUS_MAP, orient="index",
+        columns=["dynamics_code", "status_label", "payment_eligible"]
+    )
+    .rename_axis("status")
+    .reset_index()
+)
+orders = orders.merge(status_df, on="status", how="left")
+
+# Any status not in STATUS_MAP gets the "unknown" defaults
+orders = orders.fillna({"dynamics_code": "000", "status_label": "UNKNOWN"})
+orders["payment_eligible"] = orders["payment_eligible"].fillna(False).astype(bool)
+
+# Status is a handful of repeating labels → Categorical (integer codes)
+orders["status"] = orders["status"].astype("category")
 
 print(pd.crosstab(orders["status"], orders["dynamics_code"]).to_string())
 
@@ -641,17 +804,21 @@ INCENTIVE_MAP = {
     "THERM002":       ("SMART_THERMOSTAT",    0.20),   # same program, pre-normalized
 }
 
-orders["incentive_program"] = orders["normalized_sku"].map(
-    lambda s: INCENTIVE_MAP.get(s, ("UNMAPPED", 0))[0]
-)
-orders["incentive_rate"] = orders["normalized_sku"].map(
-    lambda s: INCENTIVE_MAP.get(s, ("UNMAPPED", 0))[1]
-)
+# Split the map into two plain dicts so .map() can do a direct
+# hash lookup per column — no lambda call per row.
+program_dict = {sku: program for sku, (program, rate) in INCENTIVE_MAP.items()}
+rate_dict    = {sku: rate    for sku, (program, rate) in INCENTIVE_MAP.items()}
+
+orders["incentive_program"] = orders["normalized_sku"].map(program_dict).fillna("UNMAPPED")
+orders["incentive_rate"]    = orders["normalized_sku"].map(rate_dict).fillna(0.0).astype("float64")
 # incentive_amount = subtotal × rate, rounded to 2 decimal places
 orders["incentive_amount"] = (orders["subtotal_clean"] * orders["incentive_rate"]).round(2)
+orders["incentive_program"] = orders["incentive_program"].astype("category")
 
-unmapped = orders[orders["incentive_program"] == "UNMAPPED"]
-print(f"  Unmapped SKUs: {len(unmapped)}")
+# Only the count is needed, so sum the boolean mask (True = 1)
+# rather than building a filtered copy of the matching rows.
+unmapped_count = (orders["incentive_program"] == "UNMAPPED").sum()
+print(f"  Unmapped SKUs: {unmapped_count}")
 print(f"  Distribution:")
 for prog, cnt in orders["incentive_program"].value_counts().items():
     print(f"    {prog}: {cnt} orders")
@@ -663,35 +830,39 @@ for prog, cnt in orders["incentive_program"].value_counts().items():
 # than $0.02, something is wrong with the order data.
 print("\n[T8] Grand total recomputation check...")
 
-orders["grand_total_check"] = (
-    orders["subtotal_clean"] +
-    orders["total_tax"].fillna(0) +      # fillna(0) treats NULL tax as $0
-    orders["shipping"].fillna(0) -
-    orders["discount"].fillna(0)
-).round(2)
+# Pull the four component columns out as plain float64 arrays.
+# np.nan_to_num treats any NULL amount as $0 without building a new
+# NaN-filled Series for each column.
+subtotal_arr, tax_arr, shipping_arr, discount_arr = (
+    np.nan_to_num(orders[c].to_numpy(dtype="float64"))
+    for c in ("subtotal_clean", "total_tax", "shipping", "discount")
+)
+grand_total_check = np.round(subtotal_arr + tax_arr + shipping_arr - discount_arr, 2)
 
-mismatches = orders[
-    (orders["grand_total_check"] - orders["grand_total"]).abs() > 0.02
-]
+mismatch_mask = np.abs(grand_total_check - orders["grand_total"].to_numpy()) > 0.02
+mismatches = (
+    orders.loc[mismatch_mask, ["order_id", "grand_total"]]
+    .assign(grand_total_check=grand_total_check[mismatch_mask])
+)
 print(f"  Mismatches found: {len(mismatches)}")
 if len(mismatches) == 0:
     print("  ✅ All grand totals reconcile correctly")
 else:
-    print(mismatches[["order_id","grand_total","grand_total_check"]].to_string(index=False))
-
-# Clean up the helper column
-orders.drop(columns=["grand_total_check"], inplace=True)
+    print(mismatches.to_string(index=False))
 
-# Save the clean orders to a processed CSV
+# Save the clean orders to a processed CSV, plus a Parquet copy that
+# Section 6 reads back with its data types (categories included)
+# intact, so nothing has to be re-parsed from text.
 orders.to_csv("data/processed/orders_clean.csv", index=False)
-print(f"\n  ✅ Saved cleaned orders: data/processed/orders_clean.csv ({len(orders)} rows)")
+orders.to_parquet("data/processed/orders_clean.parquet", index=False, compression="zstd")
+print(f"\n  ✅ Saved cleaned orders: data/processed/orders_clean.parquet/.csv ({len(orders)} rows)")
 
 
 # ============================================================
 # SECTION 6: RECONCILIATION — MAGENTO vs PAYMENT PROCESSOR
 # ============================================================
-# Load the clean orders and transactions into SQLite for
-# the reconciliation queries. This mirrors what you'd do when
+# Load the clean orders into SQLite next to the raw transactions
+# for the reconciliation queries. This mirrors what you'd do when
 # comparing against the Authorize.net settlement file.
 # ============================================================
 
@@ -699,14 +870,43 @@ print("\n" + "=" * 65)
 print("  SECTION 6: RECONCILIATION CHECKS")
 print("=" * 65)
 
-# Load clean orders and transactions into SQLite
-orders_clean = pd.read_csv("data/processed/orders_clean.csv")
-transactions  = pd.read_csv("data/raw/payment_transactions.csv")
-customers_df  = pd.read_csv("data/raw/magento_customers.csv")
-
-orders_clean.to_sql("orders_clean",        conn, index=False, if_exists="replace")
-transactions.to_sql("payment_transactions", conn, index=False, if_exists="replace")
-customers_df.to_sql("magento_customers",    conn, index=False, if_exists="replace")
+# Load clean orders into SQLite.
+# payment_transactions and magento_customers are already in the
+# database from Section 3 (raw files, unchanged by cleaning), so they
+# are NOT pushed through pandas and re-inserted a second time.
+# That leaves this one file read in Section 6, and the pyarrow engine
+# already reads its columns on multiple threads.
+# Only read the columns the reconciliation and settlement queries
+# use (the raw sku/date/subtotal/tax columns are skipped). Parquet
+# keeps the categories from Section 5, so only payment_method needs
+# converting. dynamics_code is cast back to the numeric Dynamics
+# status code that the settlement file carries.
+orders_clean = pd.read_parquet(
+    "data/processed/orders_clean.parquet",
+    columns=[
+        "order_id", "customer_id", "invoice_number", "order_date_iso",
+        "normalized_sku", "incentive_program", "qty",
+        "subtotal_clean", "total_tax", "tax_source", "shipping", "discount",
+        "grand_total", "incentive_rate", "incentive_amount",
+        "status", "dynamics_code", "status_label", "payment_eligible",
+        "payment_method",
+    ],
+).astype({"payment_method": "category", "dynamics_code": "int64"})
+
+# Same load path as Section 3: the table, its index and the ANALYZE
+# all run in one explicit transaction that commits (or rolls back)
+# as a whole.
+with conn:
+    conn.execute("BEGIN")
+    load_table(orders_clean, "orders_clean")
+    # Index the join key once, up front. Every reconciliation query
+    # and the settlement join match rows on order_id, and each can
+    # reuse this index instead of scanning orders_clean again.
+    # order_id is unique after Transform 1, so the index is UNIQUE.
+    conn.execute("CREATE UNIQUE INDEX ix_oc_order_id ON orders_clean(order_id)")
+    # The Section 3 ANALYZE ran before orders_clean existed. Refresh
+    # the statistics so the planner knows this table's size too.
+    conn.execute("ANALYZE")
 
 
 # ── 6A. High-level reconciliation ───────────────────────────
@@ -777,54 +977,94 @@ print("\n" + "=" * 65)
 print("  SECTION 7: BUILD SETTLEMENT FILE")
 print("=" * 65)
 
-# Filter: only settled transactions
-settled = transactions[transactions["status"] == "settled"].copy()
-settled = settled.rename(columns={
-    "transaction_id": "txn_id",
-    "settle_date":    "settlement_date",
-    "processor_fee":  "processing_fee",
-    "net_amount":     "net_settled_amount",
-})
-
-# Filter: only payment-eligible orders
-eligible = orders_clean[orders_clean["payment_eligible"] == True].copy()
-
-# Join 1: eligible orders + settled transactions (INNER JOIN = must match both)
-# An inner join keeps only rows where the order_id exists in BOTH tables.
-settlement = eligible.merge(
-    settled[["order_id", "txn_id", "settlement_date", "processing_fee", "net_settled_amount"]],
-    on="order_id",
-    how="inner"   # only keep orders that have a settled transaction
-)
-
-# Join 2: add customer information (LEFT JOIN = keep all orders even if no customer found)
-settlement = settlement.merge(
-    customers_df[["customer_id", "first_name", "last_name", "email", "state"]],
-    on="customer_id",
-    how="left"
-)
+# Guard the join cardinality first — the SQL version of pandas'
+# merge(..., validate="m:1"). Each order may match at most ONE settled
+# transaction and ONE customer; a duplicate key would silently
+# multiply settlement rows. A UNIQUE index makes SQLite raise an
+# IntegrityError on duplicates instead, and the joins below use the
+# same indexes for direct lookups. (The WHERE clause makes a partial
+# index: only settled transactions must be unique per order.)
+with conn:
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_txn_settled_order
+        ON payment_transactions(order_id) WHERE status = 'settled'
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_customers_id
+        ON magento_customers(customer_id)
+    """)
+
+# One SQL query does both joins inside SQLite, so the transactions
+# and customers never have to be copied into pandas just to be merged.
+# Only the final settlement rows come back as a DataFrame.
+#   Join 1: eligible orders + settled transactions (INNER JOIN = must match both)
+#           keeps only rows where the order_id exists in BOTH tables.
+#   Join 2: add customer information (LEFT JOIN = keep all orders even
+#           if no customer is found)
+# The SELECT list also picks and renames the columns for the final
+# output schema. Because the projection happens inside the query,
+# the join only carries the columns listed here. The unused
+# transaction and customer fields (auth_code, created_at, loyalty_tier)
+# are never copied into the result.
+settlement_final = run_sql("""
+    SELECT
+        o.order_id,
+        o.invoice_number,
+        o.order_date_iso     AS order_timestamp,
+        t.settle_date        AS settlement_date,
+        o.customer_id,
+        c.first_name,
+        c.last_name,
+        c.email,
+        c.state,
+        o.normalized_sku     AS sku_normalized,
+        o.incentive_program,
+        o.qty,
+        o.subtotal_clean     AS subtotal,
+        o.total_tax,
+        o.tax_source,
+        o.shipping,
+        o.discount,
+        o.grand_total,
+        o.incentive_rate,
+        o.incentive_amount,
+        t.processor_fee      AS processing_fee,
+        t.net_amount         AS net_settled_amount,
+        o.dynamics_code      AS dynamics_status_code,
+        o.status_label,
+        t.transaction_id     AS txn_id
+    FROM orders_clean o
+    INNER JOIN payment_transactions t
+            ON t.order_id = o.order_id
+           AND t.status   = 'settled'       -- only settled transactions
+    LEFT JOIN magento_customers c
+           ON c.customer_id = o.customer_id
+    WHERE o.payment_eligible = 1            -- only payment-eligible orders
+    ORDER BY o.order_id
+""")
 
-# Select and rename columns for the final output schema
-settlement_final = settlement[[
-    "order_id", "invoice_number", "order_date_iso", "settlement_date",
-    "customer_id", "first_name", "last_name", "email", "state",
-    "normalized_sku", "incentive_program", "qty",
-    "subtotal_clean", "total_tax", "tax_source", "shipping", "discount",
-    "grand_total", "incentive_rate", "incentive_amount",
-    "processing_fee", "net_settled_amount",
-    "dynamics_code", "status_label", "txn_id"
-]].rename(columns={
-    "order_date_iso":  "order_timestamp",
-    "subtotal_clean":  "subtotal",
-    "normalized_sku":  "sku_normalized",
-    "dynamics_code":   "dynamics_status_code",
+# The text columns with only a few distinct values become
+# Categoricals, so the summary group-bys in Section 8 work on small
+# integer codes.
+settlement_final = settlement_final.astype({
+    "state":                "category",
+    "incentive_program":    "category",
+    "tax_source":           "category",
+    "status_label":         "category",
+    "dynamics_status_code": "category",
 })
 
+# Sum the four money columns ONCE and reuse the results here and in
+# the Section 9 summary instead of re-scanning each column every time.
+totals = settlement_final[
+    ["grand_total", "incentive_amount", "processing_fee", "net_settled_amount"]
+].sum()
+
 print(f"\n  Settlement records: {len(settlement_final)}")
-print(f"  Total gross revenue:    ${settlement_final['grand_total'].sum():,.2f}")
-print(f"  Total incentives due:   ${settlement_final['incentive_amount'].sum():,.2f}")
-print(f"  Total processor fees:   ${settlement_final['processing_fee'].sum():,.2f}")
-print(f"  Net to client:          ${settlement_final['net_settled_amount'].sum():,.2f}")
+print(f"  Total gross revenue:    ${totals['grand_total']:,.2f}")
+print(f"  Total incentives due:   ${totals['incentive_amount']:,.2f}")
+print(f"  Total processor fees:   ${totals['processing_fee']:,.2f}")
+print(f"  Net to client:          ${totals['net_settled_amount']:,.2f}")
 
 
 # ============================================================
@@ -838,12 +1078,20 @@ print("\n" + "=" * 65)
 print("  SECTION 8: EXPORTING OUTPUT FILES")
 print("=" * 65)
 
+def write_csv(df, path):
+    """
+    Helper: write a DataFrame to CSV with PyArrow's multithreaded C++
+    writer instead of pandas' per-cell Python CSV writer.
+    Text values are written in double quotes.
+    """
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
 
 # ── Output 1: CSV ────────────────────────────────────────────
 # Best for: ETL pipelines, internal data exchange, bulk imports
 # Format: plain text, one row per order, no formatting
 csv_path = "data/output/settlement_ready.csv"
-settlement_final.to_csv(csv_path, index=False)
+write_csv(settlement_final, csv_path)
 print(f"\n  [CSV] Saved: {csv_path}")
 
 
@@ -852,24 +1100,41 @@ print(f"\n  [CSV] Saved: {csv_path}")
 # Format: structured key-value pairs, machine-readable
 json_path = "data/output/settlement_ready.json"
 
-# Build a JSON payload with a summary header and the order records
-json_payload = {
+# Summary header for the JSON payload. The order records are added
+# below, a chunk at a time, so the full list of order dicts and its
+# JSON text never have to sit in memory at once.
+json_header = {
     "export_timestamp":   datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
     "source_system":      "Magento / Commerce Manager",
     "target_system":      "Microsoft Dynamics",
     "record_count":       len(settlement_final),
     "summary": {
-        "total_gross_revenue":     round(float(settlement_final["grand_total"].sum()), 2),
-        "total_incentive_payable": round(float(settlement_final["incentive_amount"].sum()), 2),
-        "total_processing_fees":   round(float(settlement_final["processing_fee"].sum()), 2),
-        "net_to_client":           round(float(settlement_final["net_settled_amount"].sum()), 2),
+        "total_gross_revenue":     round(float(totals["grand_total"]), 2),
+        "total_incentive_payable": round(float(totals["incentive_amount"]), 2),
+        "total_processing_fees":   round(float(totals["processing_fee"]), 2),
+        "net_to_client":           round(float(totals["net_settled_amount"]), 2),
     },
-    # orient="records" creates a list of {column: value} dicts — one per row
-    "orders": json.loads(settlement_final.to_json(orient="records", date_format="iso"))
 }
+json_chunk_rows = 10_000
 
 with open(json_path, "w") as f:
-    json.dump(json_payload, f, indent=2, default=str)
+    # Header keys first, leaving the closing brace off so the
+    # "orders" list can follow as the last key.
+    f.write(json.dumps(json_header, indent=2)[:-2])
+    f.write(',\n  "orders": [')
+    separator = "\n"
+    for start in range(0, len(settlement_final), json_chunk_rows):
+        chunk = settlement_final.iloc[start:start + json_chunk_rows]
+        # orient="records" creates a list of {column: value} dicts — one
+        # per row. Missing values become None so they are written as null.
+        records = chunk.astype(object).where(chunk.notna(), None).to_dict(orient="records")
+        for record in records:
+            # Indent each record to sit inside the "orders" list, the
+            # same layout json.dump(..., indent=2) gives the whole payload
+            record_json = json.dumps(record, indent=2, default=str)
+            f.write(separator + "    " + record_json.replace("\n", "\n    "))
+            separator = ",\n"
+    f.write("\n  ]\n}" if len(settlement_final) else "]\n}")
 print(f"  [JSON] Saved: {json_path}")
 
 
@@ -878,76 +1143,132 @@ print(f"  [JSON] Saved: {json_path}")
 # Format: Excel with 4 tabs, colored headers, auto-sized columns
 xlsx_path = "data/output/invoice_report.xlsx"
 
+def column_widths(df):
+    """
+    Helper: Excel column widths for a DataFrame — the length of the
+    longest value (or the header, if longer) + 3, capped at 40.
+    Uses vectorized string lengths on the DataFrame instead of
+    reading every cell back out of the worksheet.
+    """
+    # Longest value per column, one column at a time so an empty
+    # frame still gets one width per header. An empty or all-missing
+    # column has no longest value (NA), so it counts as 0.
+    value_len = (
+        pd.Series([s.astype("string").str.len().max() for _, s in df.items()],
+                  dtype="Int64")
+        .fillna(0)
+        .to_numpy(dtype="int64")
+    )
+    widths = np.maximum(df.columns.str.len().to_numpy(), value_len)
+    return np.minimum(widths + 3, 40)
+
+def format_sheet(ws, df, header_font, header_fill, header_align):
+    """
+    Helper: style a worksheet right after df.to_excel() has written it.
+    Only the header row is touched; column widths come from the
+    DataFrame, so the data cells are never walked a second time.
+    """
+    # Style the header row
+    for cell in ws[1]:
+        cell.font      = header_font
+        cell.fill      = header_fill
+        cell.alignment = header_align
+    # Auto-size all columns from the DataFrame's values
+    for i, width in enumerate(column_widths(df), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = int(width)
+    ws.freeze_panes = "A2"  # freeze header row when scrolling
+
+# Header style shared by all four tabs
+header_fill = PatternFill("solid", fgColor="1F4E79")
+header_font = Font(bold=True, color="FFFFFF", name="Arial")
+center_align = Alignment(horizontal="center")
+
 with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
 
     # ── Tab 1: Settlement Detail (all records) ────────────────
     settlement_final.to_excel(writer, sheet_name="Settlement Detail", index=False)
+    format_sheet(writer.sheets["Settlement Detail"], settlement_final,
+                 header_font, header_fill, center_align)
+
+    # Settlement month for the summaries. settlement_date is always
+    # 'YYYY-MM-DD', so give the parser the exact format (cache=True
+    # parses each repeated date only once) and format straight to
+    # 'YYYY-MM' — no Period conversion needed.
+    settlement_final["month"] = (
+        pd.to_datetime(settlement_final["settlement_date"], format="%Y-%m-%d",
+                       errors="coerce", cache=True)
+        .dt.strftime("%Y-%m")
+    )
+
+    # Both summary tabs add up the same settlement measures, so group
+    # once by (program, month) and roll that small table up to each
+    # tab, instead of grouping the full settlement data twice.
+    # dropna=False keeps orders whose settlement month could not be
+    # parsed, so they still count toward their program's totals.
+    program_month = settlement_final.groupby(
+        ["incentive_program", "month"], observed=True, sort=False, dropna=False
+    ).agg(
+        order_count=("order_id", "count"),
+        subtotal=("subtotal", "sum"),
+        total_tax=("total_tax", "sum"),
+        grand_total=("grand_total", "sum"),
+        processing_fee=("processing_fee", "sum"),
+        incentive_amount=("incentive_amount", "sum"),
+        net_settled_amount=("net_settled_amount", "sum"),
+    )
 
     # ── Tab 2: Program Summary (grouped by incentive program) ──
+    # sort=False skips sorting the group keys — the result is sorted
+    # by net_revenue below anyway.
     program_summary = (
-        settlement_final
-        .groupby("incentive_program")
-        .agg(
-            order_count=("order_id", "count"),
-            total_subtotal=("subtotal", "sum"),
-            total_tax=("total_tax", "sum"),
-            total_incentive=("incentive_amount", "sum"),
-            net_revenue=("net_settled_amount", "sum")
-        )
+        program_month
+        .groupby(level="incentive_program", observed=True, sort=False)
+        .sum()
+        [["order_count", "subtotal", "total_tax", "incentive_amount", "net_settled_amount"]]
+        .rename(columns={
+            "subtotal":           "total_subtotal",
+            "incentive_amount":   "total_incentive",
+            "net_settled_amount": "net_revenue",
+        })
         .round(2)
         .reset_index()
         .sort_values("net_revenue", ascending=False)
     )
     program_summary.to_excel(writer, sheet_name="Program Summary", index=False)
+    format_sheet(writer.sheets["Program Summary"], program_summary,
+                 header_font, header_fill, center_align)
 
     # ── Tab 3: Monthly Summary (grouped by settlement month) ───
-    settlement_final["month"] = (
-        pd.to_datetime(settlement_final["settlement_date"], errors="coerce")
-        .dt.to_period("M")
-        .astype(str)
-    )
     monthly = (
-        settlement_final
-        .groupby("month")
-        .agg(
-            transactions=("order_id", "count"),
-            gross_revenue=("grand_total", "sum"),
-            processing_fees=("processing_fee", "sum"),
-            incentive_payable=("incentive_amount", "sum"),
-            net_to_client=("net_settled_amount", "sum")
-        )
+        program_month
+        .groupby(level="month")
+        .sum()
+        [["order_count", "grand_total", "processing_fee", "incentive_amount", "net_settled_amount"]]
+        .rename(columns={
+            "order_count":        "transactions",
+            "grand_total":        "gross_revenue",
+            "processing_fee":     "processing_fees",
+            "incentive_amount":   "incentive_payable",
+            "net_settled_amount": "net_to_client",
+        })
         .round(2)
         .reset_index()
     )
     monthly.to_excel(writer, sheet_name="Monthly Summary", index=False)
+    format_sheet(writer.sheets["Monthly Summary"], monthly,
+                 header_font, header_fill, center_align)
 
     # ── Tab 4: Issues Log (for finance team) ──────────────────
     df_issues.to_excel(writer, sheet_name="Issues Log", index=False)
-
-    # ── Apply formatting to all tabs ──────────────────────────
-    header_fill = PatternFill("solid", fgColor="1F4E79")
-    header_font = Font(bold=True, color="FFFFFF", name="Arial")
-    center_align = Alignment(horizontal="center")
-
-    for sheet_name in writer.sheets:
-        ws = writer.sheets[sheet_name]
-        # Style the header row
-        for cell in ws[1]:
-            cell.font      = header_font
-            cell.fill      = header_fill
-            cell.alignment = center_align
-        # Auto-size all columns
-        for col in ws.columns:
-            max_len = max(len(str(cell.value or "")) for cell in col)
-            ws.column_dimensions[get_column_letter(col[0].column)].width = min(max_len + 3, 40)
-        ws.freeze_panes = "A2"  # freeze header row when scrolling
+    format_sheet(writer.sheets["Issues Log"], df_issues,
+                 header_font, header_fill, center_align)
 
 print(f"  [XLSX] Saved: {xlsx_path} (4 tabs)")
 
 # ── Output 4: Validation flags CSV ───────────────────────────
 # Standalone issues file for quick handoff to the finance team
 flags_path = "data/output/validation_flags.csv"
-df_issues.to_csv(flags_path, index=False)
+write_csv(df_issues, flags_path)
 print(f"  [CSV] Saved: {flags_path} (issues log)")
 
 
@@ -959,6 +1280,10 @@ print("\n" + "=" * 65)
 print("  PIPELINE COMPLETE — FINAL SUMMARY")
 print("=" * 65)
 
+# Count every issue type in one pass instead of filtering df_issues
+# once per type. .get(..., 0) covers a type that was never logged.
+issue_counts = df_issues["issue_type"].value_counts()
+
 print(f"""
   RAW DATA (from Magento + Authorize.net):
   ├── {len(df_orders)} order rows (including duplicates)
@@ -966,9 +1291,9 @@ print(f"""
   └── {len(df_transactions)} payment transactions
 
   ISSUES FOUND:
-  ├── {len(df_issues[df_issues['issue_type']=='DUPLICATE_ORDER'])} duplicate order IDs
-  ├── {len(df_issues[df_issues['issue_type']=='MISSING_INVOICE'])} orders missing invoice number
-  └── {len(df_issues[df_issues['issue_type']=='ORPHAN_TRANSACTION'])} orphan transactions (${orphans['gross_amount'].sum():,.2f})
+  ├── {issue_counts.get('DUPLICATE_ORDER', 0)} duplicate order IDs
+  ├── {issue_counts.get('MISSING_INVOICE', 0)} orders missing invoice number
+  └── {issue_counts.get('ORPHAN_TRANSACTION', 0)} orphan transactions (${orphans['gross_amount'].sum():,.2f})
 
   TRANSFORMATIONS APPLIED:
   ├── Deduplication: {len(df_orders) - len(orders)} rows removed
@@ -980,10 +1305,10 @@ print(f"""
 
   SETTLEMENT FILE:
   ├── {len(settlement_final)} payment-eligible settled records
-  ├── Gross revenue:      ${settlement_final['grand_total'].sum():,.2f}
-  ├── Incentives payable: ${settlement_final['incentive_amount'].sum():,.2f}
-  ├── Processor fees:     ${settlement_final['processing_fee'].sum():,.2f}
-  └── Net to client:      ${settlement_final['net_settled_amount'].sum():,.2f}
+  ├── Gross revenue:      ${totals['grand_total']:,.2f}
+  ├── Incentives payable: ${totals['incentive_amount']:,.2f}
+  ├── Processor fees:     ${totals['processing_fee']:,.2f}
+  └── Net to client:      ${totals['net_settled_amount']:,.2f}
 
   OUTPUT FILES:
   ├── data/output/settlement_ready.csv   (upload-ready flat file)